@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from app.models.schemas import (
     DownloadResponse, ExtractResponse, FileListResponse, 
     DeleteResponse, DatasetListResponse, HealthResponse
 )
 from app.services.dataset_service import DatasetService
-from app.core.config import settings
+from app.core.config import DATASET_NAMES, Settings, get_settings
 from app.core.logging import logger
 
 
@@ -13,59 +14,66 @@ router = APIRouter()
 
 dataset_service = DatasetService()
 
-@router.get("/", response_model=HealthResponse)
-async def root():
+# Azure returns at most 5000 blobs per listing page
+MAX_FILES_PAGE_SIZE = 5000
+
+@router.get("/", response_model=None, responses={200: {"model": HealthResponse}})
+async def root(settings: Settings = Depends(get_settings)):
     """Root endpoint with basic API information"""
-    return HealthResponse(
+    return HealthResponse.model_construct(
         status="healthy",
         message=f"{settings.app_name} API",
         version=settings.app_version
     )
 
-@router.get("/datasets", response_model=DatasetListResponse)
+@router.get("/datasets", response_model=None, responses={200: {"model": DatasetListResponse}})
 async def list_datasets():
     """List all available IMDb datasets"""
-    return DatasetListResponse(
-        datasets=list(settings.imdb_datasets.keys()),
-        total_count=len(settings.imdb_datasets)
-    )
+    return ORJSONResponse(content=dict(DatasetListResponse.model_construct(
+        datasets=DATASET_NAMES,
+        total_count=len(DATASET_NAMES)
+    )))
 
-@router.post("/download", response_model=DownloadResponse)
+@router.post("/download", response_model=None, responses={200: {"model": DownloadResponse}})
 async def download_all_datasets():
     """Download all IMDb datasets"""
     try:
         result = await dataset_service.download_all_datasets()
-        return JSONResponse(status_code=200, content=result.dict())
+        return ORJSONResponse(content=dict(result))
     except Exception as e:
         logger.error(f"Download endpoint error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/extract", response_model=ExtractResponse)
+@router.post("/extract", response_model=None, responses={200: {"model": ExtractResponse}})
 async def extract_all_datasets():
     """Extract all downloaded .tsv.gz files"""
     try:
         result = await dataset_service.extract_all_datasets()
-        return JSONResponse(status_code=200, content=result.dict())
+        return ORJSONResponse(content=dict(result))
     except Exception as e:
         logger.error(f"Extract endpoint error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/files", response_model=FileListResponse)
-async def list_files():
-    """List all files in the download directory"""
+@router.get("/files", response_model=None, responses={200: {"model": FileListResponse}})
+async def list_files(
+    token: Optional[str] = Query(None, description="Continuation token from a previous page"),
+    limit: int = Query(MAX_FILES_PAGE_SIZE, ge=1, le=MAX_FILES_PAGE_SIZE, description="Maximum files per page")
+):
+    """List files in the download directory, one page at a time"""
     try:
-        result = await dataset_service.list_files()
-        return result
+        result = await dataset_service.list_files(limit, token)
+        # orjson encodes the FileInfo dataclasses natively, skipping pydantic serialization
+        return ORJSONResponse(content=dict(result))
     except Exception as e:
         logger.error(f"List files endpoint error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.delete("/files", response_model=DeleteResponse)
+@router.delete("/files", response_model=None, responses={200: {"model": DeleteResponse}})
 async def delete_all_files():
     """Delete all files in the download directory"""
     try:
         result = await dataset_service.delete_all_files()
-        return result
+        return ORJSONResponse(content=dict(result))
     except Exception as e:
         logger.error(f"Delete files endpoint error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -74,29 +82,24 @@ async def delete_all_files():
 async def full_data_process():
     """Complete data processing: download and extract datasets"""
     try:
-
-        download_result = await dataset_service.download_all_datasets()
+        download_result, extract_result = await dataset_service.download_and_extract_datasets()
         if download_result.successful_downloads == 0:
             raise Exception("No files were downloaded successfully")
         
-        extract_result = await dataset_service.extract_all_datasets()
         if extract_result.successful_extractions == 0:
             raise Exception("No files were extracted successfully")
         
-        return JSONResponse(
-            status_code=200,
-            content={
-                "message": "Full data processing completed",
-                "download": {
-                    "downloaded_files": download_result.downloaded_files,
-                    "successful_downloads": download_result.successful_downloads
-                },
-                "extract": {
-                    "extracted_files": extract_result.extracted_files,
-                    "successful_extractions": extract_result.successful_extractions
-                }
+        return ORJSONResponse(content={
+            "message": "Full data processing completed",
+            "download": {
+                "downloaded_files": download_result.downloaded_files,
+                "successful_downloads": download_result.successful_downloads
+            },
+            "extract": {
+                "extracted_files": extract_result.extracted_files,
+                "successful_extractions": extract_result.successful_extractions
             }
-        )
+        })
     except Exception as e:
         logger.error(f"Full process endpoint error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
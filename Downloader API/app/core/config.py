@@ -1,30 +1,57 @@
-from pydantic_settings import BaseSettings
-from typing import Dict
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Mapping, Tuple
 import os
+import re
+import sys
 
-class Settings(BaseSettings):
+# Read-only dataset table shared process-wide instead of being validated per Settings instance
+_IMDB_DATASETS: Mapping[str, str] = MappingProxyType({
+    "name.basics.tsv.gz": "https://datasets.imdbws.com/name.basics.tsv.gz",
+    "title.akas.tsv.gz": "https://datasets.imdbws.com/title.akas.tsv.gz",
+    "title.basics.tsv.gz": "https://datasets.imdbws.com/title.basics.tsv.gz",
+    "title.crew.tsv.gz": "https://datasets.imdbws.com/title.crew.tsv.gz",
+    "title.episode.tsv.gz": "https://datasets.imdbws.com/title.episode.tsv.gz",
+    "title.principals.tsv.gz": "https://datasets.imdbws.com/title.principals.tsv.gz",
+    "title.ratings.tsv.gz": "https://datasets.imdbws.com/title.ratings.tsv.gz"
+})
+
+# Derived lookups built once so request paths never rebuild lists or slice filenames
+_ITEMS: Tuple[Tuple[str, str], ...] = tuple((sys.intern(name), url) for name, url in _IMDB_DATASETS.items())
+_NAMES: Tuple[str, ...] = tuple(name for name, _ in _ITEMS)
+_STEM_BY_NAME: Mapping[str, str] = MappingProxyType({n: n[:-len(".tsv.gz")] for n in _NAMES})
+_TSV_BY_NAME: Mapping[str, str] = MappingProxyType({n: sys.intern(f"{_STEM_BY_NAME[n]}.tsv") for n in _NAMES})
+# Every known dataset filename mapped to itself, used to swap externally supplied copies for the shared objects
+_CANON_NAMES: Mapping[str, str] = MappingProxyType({
+    **{n: n for n in _NAMES},
+    **{n: n for n in _TSV_BY_NAME.values()}
+})
+
+# Public read-only views of the dataset table; they need no settings load
+IMDB_DATASETS = _IMDB_DATASETS
+DATASET_NAMES = _NAMES
+
+_TRUE_VALUES = frozenset({"1", "true", "yes", "on", "t", "y"})
+_FALSE_VALUES = frozenset({"0", "false", "no", "off", "f", "n"})
+_INLINE_COMMENT = re.compile(r"\s+#")
+
+_DOTENV_PATH = ".env"
+
+@dataclass(frozen=True, slots=True)
+class Settings:
     """Application settings and configuration"""
     
-
     app_name: str = "IMDb Dataset Downloader"
     app_version: str = "1.0.0"
     debug: bool = False
     
     host: str = "0.0.0.0"
     port: int = 8000
+    workers: int = 1
     
     download_dir: str = "imdb_datasets"
     
-    imdb_datasets: Dict[str, str] = {
-        "name.basics.tsv.gz": "https://datasets.imdbws.com/name.basics.tsv.gz",
-        "title.akas.tsv.gz": "https://datasets.imdbws.com/title.akas.tsv.gz",
-        "title.basics.tsv.gz": "https://datasets.imdbws.com/title.basics.tsv.gz",
-        "title.crew.tsv.gz": "https://datasets.imdbws.com/title.crew.tsv.gz",
-        "title.episode.tsv.gz": "https://datasets.imdbws.com/title.episode.tsv.gz",
-        "title.principals.tsv.gz": "https://datasets.imdbws.com/title.principals.tsv.gz",
-        "title.ratings.tsv.gz": "https://datasets.imdbws.com/title.ratings.tsv.gz"
-    }
-    
     log_level: str = "INFO"
     
     azure_storage_account_name: str = ""
@@ -32,9 +59,113 @@ class Settings(BaseSettings):
     azure_storage_connection_string: str = ""
     azure_container_name: str = "imdb-datasets"
     use_azure_blob: bool = True
+    azure_server_side_copy: bool = False
+    
+    download_parallelism: int = 4
+    blob_max_concurrency: int = 16
+    blob_max_block_size: int = 8 * 1024 * 1024
+    blob_max_chunk_get_size: int = 16 * 1024 * 1024
+    
+    @property
+    def imdb_datasets(self) -> Mapping[str, str]:
+        """IMDb dataset filenames mapped to their download URLs"""
+        return _IMDB_DATASETS
+    
+    @property
+    def dataset_items(self) -> Tuple[Tuple[str, str], ...]:
+        """IMDb dataset (filename, URL) pairs in download order"""
+        return _ITEMS
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    @property
+    def dataset_names(self) -> Tuple[str, ...]:
+        """IMDb dataset filenames in download order"""
+        return _NAMES
+    
+    @property
+    def extracted_names(self) -> Mapping[str, str]:
+        """IMDb dataset filenames mapped to their extracted .tsv filenames"""
+        return _TSV_BY_NAME
+    
+    @property
+    def canonical_names(self) -> Mapping[str, str]:
+        """Known compressed and extracted filenames mapped to their shared string objects"""
+        return _CANON_NAMES
+    
+
+def _parse_dotenv(path: str) -> Dict[str, str]:
+    """Parse KEY=VALUE lines from a .env file into a lower-cased mapping"""
+    values = {}
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = _parse_dotenv_line(line)
+        values[key] = value
+    return values
+
+def _parse_dotenv_line(line: str) -> Tuple[str, str]:
+    """Split one KEY=VALUE .env line into a lower-cased key and unquoted value"""
+    key, _, value = line.partition("=")
+    key = key.strip().removeprefix("export ").strip()
+    value = value.strip()
+    quote = value[:1]
+    if quote in ("'", '"') and value.find(quote, 1) > 0:
+        value = value[1:value.find(quote, 1)]
+    elif value.startswith("#"):
+        value = ""
+    else:
+        # Unquoted values may end with an inline " # comment", as python-dotenv allows
+        value = _INLINE_COMMENT.split(value, 1)[0]
+    return key.lower(), value
+
+def _parse_bool(name: str, value: str) -> bool:
+    """Interpret an environment string as a boolean flag"""
+    value = value.strip().lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES:
+        return False
+    raise ValueError(f"Invalid boolean value for {name.upper()}: {value!r}")
+
+def _parse_int(name: str, value: str) -> int:
+    """Interpret an environment string as an integer"""
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid integer value for {name.upper()}: {value!r}") from None
+
+def _load() -> Settings:
+    """Build settings from .env and the process environment, which takes precedence"""
+    values = _parse_dotenv(_DOTENV_PATH) if os.path.isfile(_DOTENV_PATH) else {}
+    values.update((key.lower(), value) for key, value in os.environ.items())
+    
+    overrides = {}
+    for field in fields(Settings):
+        value = values.get(field.name)
+        if value is None:
+            continue
+        if field.type is bool or field.type is int:
+            # A blank KEY= line leaves the default in place rather than coercing to False or failing
+            if not value.strip():
+                continue
+            if field.type is bool:
+                overrides[field.name] = _parse_bool(field.name, value)
+            else:
+                overrides[field.name] = _parse_int(field.name, value)
+        else:
+            overrides[field.name] = value
+    return Settings(**overrides)
+
+@lru_cache(maxsize=1)
+def _cached_settings() -> Settings:
+    """Load the settings, including the .env file, once per process"""
+    return _load()
 
-settings = Settings()
+def get_settings() -> Settings:
+    """Return the process-wide settings, loading them on first use"""
+    # RELOAD_CONFIG=1 re-reads .env and the environment on every call instead of reusing the cache
+    if os.environ.get("RELOAD_CONFIG") == "1":
+        _cached_settings.cache_clear()
+    return _cached_settings()
@@ -1,15 +1,28 @@
+import atexit
 import logging
-from app.core.config import settings
+import logging.handlers
+import queue
+from app.core.config import get_settings
 
 def setup_logging():
     """Configure logging for the application"""
+    settings = get_settings()
+    
+    # Handlers run on a background listener thread so log calls never block the event loop
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue,
+        logging.StreamHandler(),
+        logging.FileHandler('imdb_downloader.log'),
+        respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    
     logging.basicConfig(
         level=getattr(logging, settings.log_level.upper()),
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('imdb_downloader.log')
-        ]
+        handlers=[logging.handlers.QueueHandler(log_queue)]
     )
     
     # Set specific loggers
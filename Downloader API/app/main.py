@@ -1,17 +1,29 @@
-from fastapi import FastAPI
+from dataclasses import asdict
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import settings
+from app.core.config import get_settings
 from app.core.logging import logger
 from app.api.v1 import api_router
+from app.api.v1.datasets import dataset_service
+from app.models.schemas import ErrorResponse
+
+async def unhandled_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
+    """Report unexpected errors as an ErrorResponse without going through pydantic"""
+    logger.error(f"Unhandled error on {request.method} {request.url.path}: {exc}")
+    error = ErrorResponse(detail=str(exc), error_code="internal_error")
+    return ORJSONResponse(content=asdict(error), status_code=500)
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application"""
+    settings = get_settings()
     
     app = FastAPI(
         title=settings.app_name,
         version=settings.app_version,
         description="A FastAPI application for downloading and extracting IMDb datasets",
-        debug=settings.debug
+        debug=settings.debug,
+        default_response_class=ORJSONResponse
     )
     
     # Add CORS middleware
@@ -26,6 +38,12 @@ def create_app() -> FastAPI:
     # Include API routes
     app.include_router(api_router)
     
+    # Return unexpected errors in the ErrorResponse shape
+    app.add_exception_handler(Exception, unhandled_exception_handler)
+    
+    # Close storage clients on shutdown
+    app.add_event_handler("shutdown", dataset_service.close)
+    
     # Log application startup
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
     
@@ -35,10 +53,20 @@ def create_app() -> FastAPI:
 app = create_app()
 
 if __name__ == "__main__":
+    import os
+    import sys
     import uvicorn
+    settings = get_settings()
+    # Same policy as the root main.py: the reload watcher is opt-in and never follows DEBUG
+    reload = os.environ.get("UVICORN_RELOAD", "0") == "1"
+    # uvloop and httptools are not available on Windows
+    use_fast_loop = sys.platform != "win32"
     uvicorn.run(
         "app.main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        reload=reload,
+        workers=int(os.environ.get("WEB_CONCURRENCY", settings.workers)),
+        loop="uvloop" if use_fast_loop else "auto",
+        http="httptools" if use_fast_loop else "auto"
     )
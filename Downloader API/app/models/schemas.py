@@ -1,61 +1,84 @@
-from pydantic import BaseModel
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pydantic import BaseModel, ConfigDict, Field, field_serializer
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+import time
+
+# Shared generic aliases so each parameterization is built once and reused by every model
+_ListStr = List[str]
+_DictStrStr = Dict[str, str]
+_ListDictStrStr = List[_DictStrStr]
+_OptStr = Optional[str]
+
+class ResponseModel(BaseModel):
+    """Base for response models built server-side from trusted data"""
+    # Frozen so a prebuilt instance can be returned from several requests without copying
+    model_config = ConfigDict(frozen=True, extra='ignore', defer_build=True)
 
 class DatasetInfo(BaseModel):
     """Information about a dataset"""
     name: str
     url: str
-    description: Optional[str] = None
+    description: _OptStr = None
 
-class FileInfo(BaseModel):
+@dataclass(slots=True)
+class FileInfo:
     """Information about a downloaded file"""
     name: str
     size_bytes: int
     size_mb: float
 
-class DownloadResponse(BaseModel):
+class DownloadResponse(ResponseModel):
     """Response model for download operations"""
     message: str
-    downloaded_files: List[str]
-    failed_downloads: List[Dict[str, str]]
+    downloaded_files: _ListStr
+    failed_downloads: _ListDictStrStr
     total_files: int
     successful_downloads: int
 
-class ExtractResponse(BaseModel):
+class ExtractResponse(ResponseModel):
     """Response model for extraction operations"""
     message: str
-    extracted_files: List[str]
-    failed_extractions: List[Dict[str, str]]
+    extracted_files: _ListStr
+    failed_extractions: _ListDictStrStr
     total_files: int
     successful_extractions: int
 
-class FileListResponse(BaseModel):
+class FileListResponse(ResponseModel):
     """Response model for file listing"""
     files: List[FileInfo]
     total_files: int
     directory: str
+    next_token: _OptStr = None
 
-class DeleteResponse(BaseModel):
+class DeleteResponse(ResponseModel):
     """Response model for file deletion"""
     message: str
-    deleted_files: List[str]
+    deleted_files: _ListStr
     total_deleted: int
 
-class DatasetListResponse(BaseModel):
+class DatasetListResponse(ResponseModel):
     """Response model for dataset listing"""
-    datasets: List[str]
+    datasets: _ListStr
     total_count: int
 
-class ErrorResponse(BaseModel):
+@dataclass(slots=True)
+class ErrorResponse:
     """Error response model"""
     detail: str
-    error_code: Optional[str] = None
-    timestamp: datetime = datetime.now()
+    error_code: _OptStr = None
+    timestamp: datetime = field(default_factory=datetime.now)
 
-class HealthResponse(BaseModel):
+class HealthResponse(ResponseModel):
     """Health check response model"""
     status: str
     message: str
     version: str
-    timestamp: datetime = datetime.now()
+    # Stored as epoch nanoseconds for a cheap default, formatted as ISO-8601 only when serialized
+    timestamp: int = Field(default_factory=time.time_ns, json_schema_extra={"type": "string", "format": "date-time"})
+    
+    @field_serializer("timestamp")
+    def _serialize_timestamp(self, timestamp: int) -> str:
+        return datetime.fromtimestamp(timestamp / 1e9).isoformat()
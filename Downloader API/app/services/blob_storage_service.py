@@ -1,36 +1,73 @@
 import asyncio
 import aiohttp
-import gzip
 import io
+import logging
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import List, Dict, Optional
-from azure.storage.blob import BlobServiceClient, ContainerClient
-from azure.core.exceptions import ResourceNotFoundError, ResourceExistsError
-from app.core.config import settings
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, List, Dict, Optional, Set, Tuple
+from azure.storage.blob import BlobProperties
+from azure.storage.blob.aio import BlobClient, BlobServiceClient
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from app.core.config import get_settings
 from app.core.logging import logger
-from app.models.schemas import DownloadResponse, ExtractResponse, FileListResponse, DeleteResponse
+from app.utils.file_utils import decompress_gzip_stream
+from app.models.schemas import DownloadResponse, ExtractResponse, FileInfo, FileListResponse, DeleteResponse
+
+# Maximum number of sub-requests Azure accepts in a single blob batch
+BLOB_BATCH_SIZE = 256
+# Number of downloaded chunks buffered ahead of each streaming upload
+STREAM_QUEUE_SIZE = 8
+
+async def _iter_queue(queue: asyncio.Queue) -> AsyncIterator[bytes]:
+    """Yield chunks from a queue until the end-of-stream marker"""
+    while True:
+        chunk = await queue.get()
+        if chunk is None:
+            return
+        yield chunk
 
 class BlobStorageService:
     """Service for handling Azure Blob Storage operations"""
     
     def __init__(self):
-        self.container_name = settings.azure_container_name
+        self.settings = get_settings()
+        self.container_name = self.settings.azure_container_name
+        self._items = self.settings.dataset_items
+        self._keys = self.settings.dataset_names
+        self._extracted_names = self.settings.extracted_names
+        self._canonical_names = self.settings.canonical_names
         self.blob_service_client = None
         self.container_client = None
+        self._blob_clients: Dict[str, BlobClient] = {}
+        self._download_semaphore = asyncio.Semaphore(self.settings.download_parallelism)
+        # Prebuilt response for the common case where every dataset downloads cleanly; its
+        # lists are tuples so the instance shared across requests is fully immutable
+        self._all_downloaded = DownloadResponse.model_construct(
+            message="Download completed to Azure Blob Storage",
+            downloaded_files=tuple(self._keys),
+            failed_downloads=(),
+            total_files=len(self._keys),
+            successful_downloads=len(self._keys)
+        )
         self._initialize_client()
     
     def _initialize_client(self):
         """Initialize Azure Blob Storage client"""
         try:
-            if settings.azure_storage_connection_string:
+            if self.settings.azure_storage_connection_string:
                 self.blob_service_client = BlobServiceClient.from_connection_string(
-                    settings.azure_storage_connection_string
+                    self.settings.azure_storage_connection_string,
+                    max_block_size=self.settings.blob_max_block_size,
+                    max_chunk_get_size=self.settings.blob_max_chunk_get_size
                 )
-            elif settings.azure_storage_account_name and settings.azure_storage_account_key:
-                account_url = f"https://{settings.azure_storage_account_name}.blob.core.windows.net"
+            elif self.settings.azure_storage_account_name and self.settings.azure_storage_account_key:
+                account_url = f"https://{self.settings.azure_storage_account_name}.blob.core.windows.net"
                 self.blob_service_client = BlobServiceClient(
                     account_url=account_url,
-                    credential=settings.azure_storage_account_key
+                    credential=self.settings.azure_storage_account_key,
+                    max_block_size=self.settings.blob_max_block_size,
+                    max_chunk_get_size=self.settings.blob_max_chunk_get_size
                 )
             else:
                 raise ValueError("Azure Storage credentials not provided")
@@ -45,7 +82,7 @@ class BlobStorageService:
     async def ensure_container_exists(self):
         """Ensure the blob container exists"""
         try:
-            self.container_client.create_container()
+            await self.container_client.create_container()
             logger.info(f"Created container: {self.container_name}")
         except ResourceExistsError:
             logger.info(f"Container already exists: {self.container_name}")
@@ -53,28 +90,44 @@ class BlobStorageService:
             logger.error(f"Failed to create container: {e}")
             raise
     
+    async def close(self):
+        """Close the underlying Azure Blob Storage clients"""
+        if self.container_client is not None:
+            await self.container_client.close()
+        if self.blob_service_client is not None:
+            await self.blob_service_client.close()
+        logger.info("Azure Blob Storage client closed")
+    
     async def download_all_datasets(self) -> DownloadResponse:
         """Download all IMDb datasets to Azure Blob Storage"""
         try:
             # Ensure container exists
             await self.ensure_container_exists()
             
-            # Clear existing files if they exist
-            await self._clear_existing_files()
-            
             downloaded_files = []
             failed_downloads = []
             
-            async with aiohttp.ClientSession() as session:
-                tasks = []
-                for filename, url in settings.imdb_datasets.items():
-                    task = self._download_file_to_blob(session, filename, url)
-                    tasks.append(task)
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=8)
+            async with aiohttp.ClientSession(connector=connector, read_bufsize=1024 * 1024) as session:
+                # Datasets whose blobs already match the published source are kept as-is
+                existing_blobs = await self._list_blob_properties()
+                unchanged = await self._find_unchanged_datasets(session, existing_blobs)
+                
+                # Clear existing files if they exist
+                await self._clear_existing_files(existing_blobs, keep=self._blob_names_for(unchanged))
                 
+                for filename in unchanged:
+                    downloaded_files.append(filename)
+                    logger.info(f"Skipped unchanged dataset: {filename}")
+                
+                pending = [(filename, url) for filename, url in self._items if filename not in unchanged]
+                tasks = [
+                    self._with_download_slot(self._download_file_to_blob(session, filename, url))
+                    for filename, url in pending
+                ]
                 results = await asyncio.gather(*tasks, return_exceptions=True)
                 
-                for i, result in enumerate(results):
-                    filename = list(settings.imdb_datasets.keys())[i]
+                for (filename, _), result in zip(pending, results):
                     if isinstance(result, Exception):
                         failed_downloads.append({"filename": filename, "error": str(result)})
                         logger.error(f"Failed to download {filename}: {result}")
@@ -82,11 +135,14 @@ class BlobStorageService:
                         downloaded_files.append(filename)
                         logger.info(f"Successfully downloaded: {filename}")
             
-            return DownloadResponse(
+            if not failed_downloads:
+                return self._all_downloaded
+            
+            return DownloadResponse.model_construct(
                 message="Download completed to Azure Blob Storage",
                 downloaded_files=downloaded_files,
                 failed_downloads=failed_downloads,
-                total_files=len(settings.imdb_datasets),
+                total_files=len(self._items),
                 successful_downloads=len(downloaded_files)
             )
             
@@ -100,27 +156,24 @@ class BlobStorageService:
             extracted_files = []
             failed_extractions = []
             
-            for filename in settings.imdb_datasets.keys():
+            # One listing call answers every existence check below
+            existing_blobs = await self._list_blob_names()
+            
+            for filename in self._keys:
                 gz_blob_name = filename
-                tsv_blob_name = filename.replace('.gz', '')
+                tsv_blob_name = self._extracted_names[filename]
                 
                 try:
                     # Check if compressed file exists
-                    if not await self._blob_exists(gz_blob_name):
+                    if gz_blob_name not in existing_blobs:
                         failed_extractions.append({
                             "filename": filename,
                             "error": "Compressed file not found in blob storage"
                         })
                         continue
                     
-                    # Download compressed file
-                    gz_data = await self._download_blob_to_memory(gz_blob_name)
-                    
-                    # Extract the gzipped data
-                    tsv_data = gzip.decompress(gz_data)
-                    
-                    # Upload extracted file
-                    await self._upload_blob_from_memory(tsv_blob_name, tsv_data)
+                    # Stream compressed chunks through the decompressor into the extracted blob
+                    await self._extract_blob_streaming(gz_blob_name, tsv_blob_name)
                     
                     extracted_files.append(tsv_blob_name)
                     logger.info(f"Successfully extracted: {tsv_blob_name}")
@@ -132,11 +185,11 @@ class BlobStorageService:
                     })
                     logger.error(f"Failed to extract {filename}: {e}")
             
-            return ExtractResponse(
+            return ExtractResponse.model_construct(
                 message="Extraction completed in Azure Blob Storage",
                 extracted_files=extracted_files,
                 failed_extractions=failed_extractions,
-                total_files=len(settings.imdb_datasets),
+                total_files=len(self._items),
                 successful_extractions=len(extracted_files)
             )
             
@@ -144,25 +197,94 @@ class BlobStorageService:
             logger.error(f"Error in extract_all_datasets: {e}")
             raise Exception(f"Extraction failed: {str(e)}")
     
-    async def list_files(self) -> FileListResponse:
-        """List all files in the Azure Blob Storage container"""
+    async def download_and_extract_datasets(self) -> Tuple[DownloadResponse, ExtractResponse]:
+        """Download and extract all IMDb datasets in a single streaming pass"""
+        if self.settings.azure_server_side_copy:
+            # Server-side ingestion never sees the bytes, so extraction needs its own pass
+            download_result = await self.download_all_datasets()
+            if download_result.successful_downloads == 0:
+                # With nothing downloaded there is nothing to extract, matching the local path
+                return download_result, self._skipped_extraction()
+            return download_result, await self.extract_all_datasets()
+        
+        try:
+            await self.ensure_container_exists()
+            
+            downloaded_files = []
+            failed_downloads = []
+            extracted_files = []
+            failed_extractions = []
+            
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=8)
+            async with aiohttp.ClientSession(connector=connector, read_bufsize=1024 * 1024) as session:
+                # Datasets that are current and already extracted are kept as-is
+                existing_blobs = await self._list_blob_properties()
+                unchanged = await self._find_unchanged_datasets(session, existing_blobs, require_extracted=True)
+                await self._clear_existing_files(existing_blobs, keep=self._blob_names_for(unchanged))
+                
+                for filename in unchanged:
+                    downloaded_files.append(filename)
+                    extracted_files.append(self._extracted_names[filename])
+                    logger.info(f"Skipped unchanged dataset: {filename}")
+                
+                pending = [(filename, url) for filename, url in self._items if filename not in unchanged]
+                tasks = [
+                    self._with_download_slot(self._download_and_extract_to_blob(session, filename, url))
+                    for filename, url in pending
+                ]
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                
+                for (filename, _), result in zip(pending, results):
+                    if isinstance(result, Exception):
+                        failed_downloads.append({"filename": filename, "error": str(result)})
+                        failed_extractions.append({"filename": filename, "error": str(result)})
+                        logger.error(f"Failed to download and extract {filename}: {result}")
+                    else:
+                        downloaded_files.append(filename)
+                        extracted_files.append(result)
+                        logger.info(f"Successfully downloaded and extracted: {filename}")
+            
+            download_result = self._all_downloaded if not failed_downloads else DownloadResponse.model_construct(
+                message="Download completed to Azure Blob Storage",
+                downloaded_files=downloaded_files,
+                failed_downloads=failed_downloads,
+                total_files=len(self._items),
+                successful_downloads=len(downloaded_files)
+            )
+            extract_result = ExtractResponse.model_construct(
+                message="Extraction completed in Azure Blob Storage",
+                extracted_files=extracted_files,
+                failed_extractions=failed_extractions,
+                total_files=len(self._items),
+                successful_extractions=len(extracted_files)
+            )
+            return download_result, extract_result
+            
+        except Exception as e:
+            logger.error(f"Error in download_and_extract_datasets: {e}")
+            raise Exception(f"Download and extraction failed: {str(e)}")
+    
+    async def list_files(self, limit: int, continuation_token: Optional[str] = None) -> FileListResponse:
+        """List one page of files in the Azure Blob Storage container"""
         try:
             files = []
             
-            blob_list = self.container_client.list_blobs()
-            for blob in blob_list:
-                files.append({
-                    "name": blob.name,
-                    "size_bytes": blob.size,
-                    "size_mb": round(blob.size / (1024 * 1024), 2),
-                    "last_modified": blob.last_modified.isoformat() if blob.last_modified else None,
-                    "content_type": blob.content_settings.content_type if blob.content_settings else None
-                })
+            pages = self.container_client.list_blobs(results_per_page=limit).by_page(
+                continuation_token=continuation_token
+            )
+            page = await pages.__anext__()
+            async for blob in page:
+                files.append(FileInfo(
+                    name=blob.name,
+                    size_bytes=blob.size,
+                    size_mb=round(blob.size / (1024 * 1024), 2)
+                ))
             
-            return FileListResponse(
+            return FileListResponse.model_construct(
                 files=files,
                 total_files=len(files),
-                directory=f"Azure Blob Container: {self.container_name}"
+                directory=f"Azure Blob Container: {self.container_name}",
+                next_token=pages.continuation_token
             )
             
         except Exception as e:
@@ -172,18 +294,10 @@ class BlobStorageService:
     async def delete_all_files(self) -> DeleteResponse:
         """Delete all files in the Azure Blob Storage container"""
         try:
-            deleted_files = []
-            
-            blob_list = self.container_client.list_blobs()
-            for blob in blob_list:
-                try:
-                    self.container_client.delete_blob(blob.name)
-                    deleted_files.append(blob.name)
-                    logger.info(f"Deleted blob: {blob.name}")
-                except Exception as e:
-                    logger.error(f"Failed to delete blob {blob.name}: {e}")
+            blob_names = [blob.name async for blob in self.container_client.list_blobs()]
+            deleted_files = await self._delete_blobs(blob_names)
             
-            return DeleteResponse(
+            return DeleteResponse.model_construct(
                 message="All files deleted successfully from Azure Blob Storage",
                 deleted_files=deleted_files,
                 total_deleted=len(deleted_files)
@@ -193,9 +307,20 @@ class BlobStorageService:
             logger.error(f"Error deleting files: {e}")
             raise Exception(f"Failed to delete files: {str(e)}")
     
+    async def _with_download_slot(self, transfer: Awaitable[str]) -> str:
+        """Run a file transfer once one of the limited download slots is free"""
+        async with self._download_semaphore:
+            return await transfer
+    
     async def _download_file_to_blob(self, session: aiohttp.ClientSession, filename: str, url: str) -> str:
         """Download a single file and upload it to Azure Blob Storage"""
         try:
+            if self.settings.azure_server_side_copy:
+                # Let Azure fetch the source directly so the bytes never pass through this service
+                blob_client = self._get_blob_client(filename)
+                await blob_client.upload_blob_from_url(url, overwrite=True)
+                return filename
+            
             async with session.get(url) as response:
                 if response.status == 200:
                     # Read the content
@@ -211,48 +336,182 @@ class BlobStorageService:
         except Exception as e:
             raise Exception(f"Failed to download {filename}: {str(e)}")
     
+    async def _download_and_extract_to_blob(self, session: aiohttp.ClientSession, filename: str, url: str) -> str:
+        """Stream a single file into its compressed and extracted blobs concurrently"""
+        tsv_blob_name = self._extracted_names[filename]
+        try:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    raise Exception(f"HTTP {response.status}: {response.reason}")
+                
+                gz_queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+                tsv_queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+                
+                async def feed():
+                    async for chunk in response.content.iter_chunked(1024 * 1024):
+                        await gz_queue.put(chunk)
+                        await tsv_queue.put(chunk)
+                    # Only mark the end of stream on success so a failed download is never committed
+                    await gz_queue.put(None)
+                    await tsv_queue.put(None)
+                
+                try:
+                    async with asyncio.TaskGroup() as group:
+                        group.create_task(feed())
+                        group.create_task(self._get_blob_client(filename).upload_blob(
+                            _iter_queue(gz_queue),
+                            overwrite=True,
+                            max_concurrency=self.settings.blob_max_concurrency
+                        ))
+                        group.create_task(self._get_blob_client(tsv_blob_name).upload_blob(
+                            decompress_gzip_stream(_iter_queue(tsv_queue)),
+                            overwrite=True,
+                            max_concurrency=self.settings.blob_max_concurrency
+                        ))
+                except ExceptionGroup as eg:
+                    raise eg.exceptions[0]
+            
+            return tsv_blob_name
+            
+        except Exception as e:
+            # Either upload may have committed before its sibling failed, e.g. a corrupt source only
+            # fails decompression after the .tsv.gz is stored, so drop both to avoid a half-processed pair
+            await self._discard_blobs(filename, tsv_blob_name)
+            raise Exception(f"Failed to download and extract {filename}: {str(e)}")
+    
+    async def _discard_blobs(self, *blob_names: str):
+        """Best-effort removal of blobs left behind by a failed transfer"""
+        for blob_name in blob_names:
+            try:
+                await self._get_blob_client(blob_name).delete_blob()
+                logger.info(f"Removed blob from failed transfer: {blob_name}")
+            except ResourceNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to remove blob {blob_name}: {e}")
+    
     async def _upload_blob_from_memory(self, blob_name: str, data: bytes):
         """Upload data from memory to blob storage"""
         try:
-            blob_client = self.container_client.get_blob_client(blob_name)
-            blob_client.upload_blob(data, overwrite=True)
-            logger.debug(f"Uploaded blob: {blob_name}")
+            blob_client = self._get_blob_client(blob_name)
+            await blob_client.upload_blob(
+                data, overwrite=True, max_concurrency=self.settings.blob_max_concurrency
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Uploaded blob: {blob_name}")
         except Exception as e:
             logger.error(f"Failed to upload blob {blob_name}: {e}")
             raise
     
-    async def _download_blob_to_memory(self, blob_name: str) -> bytes:
-        """Download blob content to memory"""
+    async def _extract_blob_streaming(self, gz_blob_name: str, tsv_blob_name: str):
+        """Decompress a gzipped blob into another blob without buffering either in memory"""
         try:
-            blob_client = self.container_client.get_blob_client(blob_name)
-            download_stream = blob_client.download_blob()
-            return download_stream.readall()
+            source_client = self._get_blob_client(gz_blob_name)
+            download_stream = await source_client.download_blob(
+                max_concurrency=self.settings.blob_max_concurrency
+            )
+            dest_client = self._get_blob_client(tsv_blob_name)
+            await dest_client.upload_blob(
+                decompress_gzip_stream(download_stream.chunks()),
+                overwrite=True,
+                max_concurrency=self.settings.blob_max_concurrency
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Extracted blob: {gz_blob_name} -> {tsv_blob_name}")
         except Exception as e:
-            logger.error(f"Failed to download blob {blob_name}: {e}")
+            logger.error(f"Failed to extract blob {gz_blob_name}: {e}")
             raise
     
-    async def _blob_exists(self, blob_name: str) -> bool:
-        """Check if a blob exists"""
-        try:
+    def _skipped_extraction(self) -> ExtractResponse:
+        """Build the extraction result for a run where nothing was downloaded"""
+        return ExtractResponse.model_construct(
+            message="Extraction skipped: no files were downloaded",
+            extracted_files=[],
+            failed_extractions=[],
+            total_files=len(self._items),
+            successful_extractions=0
+        )
+    
+    def _get_blob_client(self, blob_name: str) -> BlobClient:
+        """Return a cached blob client for the given blob name"""
+        blob_client = self._blob_clients.get(blob_name)
+        if blob_client is None:
             blob_client = self.container_client.get_blob_client(blob_name)
-            blob_client.get_blob_properties()
-            return True
-        except ResourceNotFoundError:
-            return False
-        except Exception as e:
-            logger.error(f"Error checking if blob {blob_name} exists: {e}")
-            return False
+            self._blob_clients[blob_name] = blob_client
+        return blob_client
     
-    async def _clear_existing_files(self):
-        """Clear existing files before downloading new ones"""
+    async def _list_blob_names(self) -> Set[str]:
+        """List the names of all blobs in the container"""
+        canonical = self._canonical_names
+        return {canonical.get(blob.name, blob.name) async for blob in self.container_client.list_blobs()}
+    
+    async def _delete_blobs(self, blob_names: List[str]) -> List[str]:
+        """Delete blobs using batch requests and return the names that were deleted"""
+        deleted_blobs = []
+        for i in range(0, len(blob_names), BLOB_BATCH_SIZE):
+            batch = blob_names[i:i + BLOB_BATCH_SIZE]
+            try:
+                responses = await self.container_client.delete_blobs(*batch, raise_on_any_failure=False)
+                results = [response async for response in responses]
+            except Exception as e:
+                logger.error(f"Failed to delete blob batch starting at {batch[0]}: {e}")
+                continue
+            
+            for blob_name, response in zip(batch, results):
+                if response.status_code == 202:
+                    deleted_blobs.append(blob_name)
+                    logger.info(f"Deleted blob: {blob_name}")
+                else:
+                    logger.error(f"Failed to delete blob {blob_name}: HTTP {response.status_code}")
+        return deleted_blobs
+    
+    async def _list_blob_properties(self) -> Dict[str, BlobProperties]:
+        """List all blobs in the container keyed by name"""
+        canonical = self._canonical_names
+        return {canonical.get(blob.name, blob.name): blob async for blob in self.container_client.list_blobs()}
+    
+    async def _find_unchanged_datasets(
+        self,
+        session: aiohttp.ClientSession,
+        existing_blobs: Dict[str, BlobProperties],
+        require_extracted: bool = False
+    ) -> List[str]:
+        """Return the datasets whose blobs already match the published source files"""
+        candidates = [
+            (filename, url) for filename, url in self._items
+            if filename in existing_blobs
+            and (not require_extracted or self._extracted_names[filename] in existing_blobs)
+        ]
+        results = await asyncio.gather(
+            *(self._is_blob_current(session, url, existing_blobs[filename]) for filename, url in candidates),
+            return_exceptions=True
+        )
+        return [filename for (filename, _), current in zip(candidates, results) if current is True]
+    
+    async def _is_blob_current(self, session: aiohttp.ClientSession, url: str, blob: BlobProperties) -> bool:
+        """Check whether a blob was uploaded after the source last changed and has the same size"""
+        async with session.head(url, allow_redirects=True) as response:
+            last_modified = response.headers.get("Last-Modified")
+            if response.status != 200 or last_modified is None:
+                return False
+            if response.content_length != blob.size:
+                return False
+            return blob.last_modified >= parsedate_to_datetime(last_modified)
+    
+    def _blob_names_for(self, filenames: List[str]) -> Set[str]:
+        """Return the compressed and extracted blob names for the given datasets"""
+        return {name for filename in filenames for name in (filename, self._extracted_names[filename])}
+    
+    async def _clear_existing_files(self, existing_blobs: Dict[str, BlobProperties], keep: Set[str]):
+        """Clear existing files before downloading new ones, keeping unchanged datasets"""
         try:
-            blob_list = self.container_client.list_blobs()
-            for blob in blob_list:
-                try:
-                    self.container_client.delete_blob(blob.name)
-                    logger.info(f"Deleted existing blob: {blob.name}")
-                except Exception as e:
-                    logger.error(f"Failed to delete existing blob {blob.name}: {e}")
+            blob_names = [name for name in existing_blobs if name not in keep]
+            await self._delete_blobs(blob_names)
         except Exception as e:
             logger.error(f"Error clearing existing files: {e}")
             raise
+
+@lru_cache(maxsize=1)
+def get_blob_storage_service() -> BlobStorageService:
+    """Return the process-wide Azure Blob Storage service"""
+    return BlobStorageService()
@@ -1,31 +1,51 @@
 import asyncio
 import aiohttp
 import aiofiles
-import gzip
-import shutil
+import os
 from pathlib import Path
-from typing import List, Dict, Tuple
-from app.core.config import settings
+from typing import Awaitable, List, Dict, Optional, Tuple
+from app.core.config import get_settings
 from app.core.logging import logger
-from app.models.schemas import DownloadResponse, ExtractResponse, FileListResponse, DeleteResponse
+from app.utils.file_utils import decompress_gzip_file, preallocate_file
+from app.models.schemas import DownloadResponse, ExtractResponse, FileInfo, FileListResponse, DeleteResponse
 
 try:
-    from app.services.blob_storage_service import BlobStorageService
+    from app.services.blob_storage_service import get_blob_storage_service
     BLOB_STORAGE_AVAILABLE = True
 except ImportError:
     BLOB_STORAGE_AVAILABLE = False
     logger.warning("Azure Blob Storage service not available")
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+RANGED_DOWNLOAD_PARTS = 8
+RANGED_DOWNLOAD_MIN_SIZE = 16 * 1024 * 1024
+
+class RangeNotSupportedError(Exception):
+    """Raised when the server answers a byte-range request with the full body"""
+
 class DatasetService:
     """Service for handling IMDb dataset operations"""
     
     def __init__(self):
-        self.download_dir = Path(settings.download_dir)
-        self.datasets = settings.imdb_datasets
-        self.use_blob_storage = settings.use_azure_blob and BLOB_STORAGE_AVAILABLE
+        self.settings = get_settings()
+        self.download_dir = Path(self.settings.download_dir)
+        self._items = self.settings.dataset_items
+        self._keys = self.settings.dataset_names
+        self._extracted_names = self.settings.extracted_names
+        self.use_blob_storage = self.settings.use_azure_blob and BLOB_STORAGE_AVAILABLE
+        self._download_semaphore = asyncio.Semaphore(self.settings.download_parallelism)
+        # Prebuilt response for the common case where every dataset downloads cleanly; its
+        # lists are tuples so the instance shared across requests is fully immutable
+        self._all_downloaded = DownloadResponse.model_construct(
+            message="Download completed",
+            downloaded_files=tuple(self._keys),
+            failed_downloads=(),
+            total_files=len(self._keys),
+            successful_downloads=len(self._keys)
+        )
         
         if self.use_blob_storage:
-            self.blob_service = BlobStorageService()
+            self.blob_service = get_blob_storage_service()
             logger.info("Using Azure Blob Storage for dataset operations")
         else:
             logger.info("Using local file storage for dataset operations")
@@ -44,12 +64,23 @@ class DatasetService:
         else:
             return await self._extract_all_datasets_local()
     
-    async def list_files(self) -> FileListResponse:
-        """List all files in the download directory or blob container"""
+    async def download_and_extract_datasets(self) -> Tuple[DownloadResponse, ExtractResponse]:
+        """Download and extract all IMDb datasets"""
+        if self.use_blob_storage:
+            return await self.blob_service.download_and_extract_datasets()
+        
+        download_result = await self._download_all_datasets_local()
+        if download_result.successful_downloads == 0:
+            # Extraction would only delete the previous .tsv files, so leave them in place
+            return download_result, self._skipped_extraction()
+        return download_result, await self._extract_all_datasets_local()
+    
+    async def list_files(self, limit: int, continuation_token: Optional[str] = None) -> FileListResponse:
+        """List one page of files in the download directory or blob container"""
         if self.use_blob_storage:
-            return await self.blob_service.list_files()
+            return await self.blob_service.list_files(limit, continuation_token)
         else:
-            return await self._list_files_local()
+            return await self._list_files_local(limit, continuation_token)
     
     async def delete_all_files(self) -> DeleteResponse:
         """Delete all files in the download directory or blob container"""
@@ -58,6 +89,11 @@ class DatasetService:
         else:
             return await self._delete_all_files_local()
     
+    async def close(self):
+        """Release storage clients held by the service"""
+        if self.use_blob_storage:
+            await self.blob_service.close()
+    
 
     async def _download_all_datasets_local(self) -> DownloadResponse:
         """Download all IMDb datasets to local storage"""
@@ -69,16 +105,15 @@ class DatasetService:
             downloaded_files = []
             failed_downloads = []
             
-            async with aiohttp.ClientSession() as session:
-                tasks = []
-                for filename, url in self.datasets.items():
-                    task = self._download_file(session, filename, url)
-                    tasks.append(task)
-                
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=8)
+            async with aiohttp.ClientSession(connector=connector, read_bufsize=DOWNLOAD_CHUNK_SIZE) as session:
+                tasks = [
+                    self._with_download_slot(self._download_file(session, filename, url))
+                    for filename, url in self._items
+                ]
                 results = await asyncio.gather(*tasks, return_exceptions=True)
                 
-                for i, result in enumerate(results):
-                    filename = list(self.datasets.keys())[i]
+                for filename, result in zip(self._keys, results):
                     if isinstance(result, Exception):
                         failed_downloads.append({"filename": filename, "error": str(result)})
                         logger.error(f"Failed to download {filename}: {result}")
@@ -86,11 +121,14 @@ class DatasetService:
                         downloaded_files.append(filename)
                         logger.info(f"Successfully downloaded: {filename}")
             
-            return DownloadResponse(
+            if not failed_downloads:
+                return self._all_downloaded
+            
+            return DownloadResponse.model_construct(
                 message="Download completed",
                 downloaded_files=downloaded_files,
                 failed_downloads=failed_downloads,
-                total_files=len(self.datasets),
+                total_files=len(self._items),
                 successful_downloads=len(downloaded_files)
             )
             
@@ -107,9 +145,9 @@ class DatasetService:
             extracted_files = []
             failed_extractions = []
             
-            for filename in self.datasets.keys():
+            for filename in self._keys:
                 gz_file_path = self.download_dir / filename
-                tsv_file_path = self.download_dir / filename.replace('.gz', '')
+                tsv_file_path = self.download_dir / self._extracted_names[filename]
                 
                 try:
                     if tsv_file_path.exists():
@@ -123,9 +161,8 @@ class DatasetService:
                         })
                         continue
                     
-                    with gzip.open(gz_file_path, 'rb') as f_in:
-                        with open(tsv_file_path, 'wb') as f_out:
-                            shutil.copyfileobj(f_in, f_out)
+                    # Decompression is blocking CPU and disk work, so keep it off the event loop
+                    await asyncio.to_thread(self._extract_file, gz_file_path, tsv_file_path)
                     
                     extracted_files.append(tsv_file_path.name)
                     logger.info(f"Successfully extracted: {tsv_file_path.name}")
@@ -137,11 +174,11 @@ class DatasetService:
                     })
                     logger.error(f"Failed to extract {filename}: {e}")
             
-            return ExtractResponse(
+            return ExtractResponse.model_construct(
                 message="Extraction completed",
                 extracted_files=extracted_files,
                 failed_extractions=failed_extractions,
-                total_files=len(self.datasets),
+                total_files=len(self._items),
                 successful_extractions=len(extracted_files)
             )
             
@@ -149,26 +186,26 @@ class DatasetService:
             logger.error(f"Error in extract_all_datasets: {e}")
             raise Exception(f"Extraction failed: {str(e)}")
     
-    async def _list_files_local(self) -> FileListResponse:
-        """List all files in the local download directory"""
+    async def _list_files_local(self, limit: int, continuation_token: Optional[str] = None) -> FileListResponse:
+        """List one page of files in the local download directory"""
         try:
             if not self.download_dir.exists():
-                return FileListResponse(files=[], total_files=0, directory=str(self.download_dir))
-            
-            files = []
-            for file_path in self.download_dir.iterdir():
-                if file_path.is_file():
-                    size_bytes = file_path.stat().st_size
-                    files.append({
-                        "name": file_path.name,
-                        "size_bytes": size_bytes,
-                        "size_mb": round(size_bytes / (1024 * 1024), 2)
-                    })
+                return FileListResponse.model_construct(files=[], total_files=0, directory=str(self.download_dir))
+            
+            files = await asyncio.to_thread(self._scan_files_in_dir)
+            
+            # Pages are ordered by name and the token is the last name already returned
+            files.sort(key=lambda file: file.name)
+            if continuation_token:
+                files = [file for file in files if file.name > continuation_token]
+            next_token = files[limit - 1].name if len(files) > limit else None
+            files = files[:limit]
             
-            return FileListResponse(
+            return FileListResponse.model_construct(
                 files=files,
                 total_files=len(files),
-                directory=str(self.download_dir)
+                directory=str(self.download_dir),
+                next_token=next_token
             )
             
         except Exception as e:
@@ -179,20 +216,15 @@ class DatasetService:
         """Delete all files in the local download directory"""
         try:
             if not self.download_dir.exists():
-                return DeleteResponse(
+                return DeleteResponse.model_construct(
                     message="Download directory does not exist",
                     deleted_files=[],
                     total_deleted=0
                 )
             
-            deleted_files = []
-            for file_path in self.download_dir.iterdir():
-                if file_path.is_file():
-                    file_path.unlink()
-                    deleted_files.append(file_path.name)
-                    logger.info(f"Deleted file: {file_path.name}")
+            deleted_files = await asyncio.to_thread(self._delete_files_in_dir)
             
-            return DeleteResponse(
+            return DeleteResponse.model_construct(
                 message="All files deleted successfully",
                 deleted_files=deleted_files,
                 total_deleted=len(deleted_files)
@@ -202,26 +234,138 @@ class DatasetService:
             logger.error(f"Error deleting files: {e}")
             raise Exception(f"Failed to delete files: {str(e)}")
     
+    def _skipped_extraction(self) -> ExtractResponse:
+        """Build the extraction result for a run where nothing was downloaded"""
+        return ExtractResponse.model_construct(
+            message="Extraction skipped: no files were downloaded",
+            extracted_files=[],
+            failed_extractions=[],
+            total_files=len(self._items),
+            successful_extractions=0
+        )
+    
+    def _extract_file(self, gz_file_path: Path, tsv_file_path: Path):
+        """Decompress a single .tsv.gz file to its .tsv counterpart"""
+        decompress_gzip_file(gz_file_path, tsv_file_path)
+    
+    def _scan_files_in_dir(self) -> List[FileInfo]:
+        """Collect name and size information for every file in the download directory"""
+        files = []
+        with os.scandir(self.download_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    size_bytes = entry.stat().st_size
+                    files.append(FileInfo(
+                        name=entry.name,
+                        size_bytes=size_bytes,
+                        size_mb=round(size_bytes / (1024 * 1024), 2)
+                    ))
+        return files
+    
+    def _delete_files_in_dir(self) -> List[str]:
+        """Delete every regular file in the download directory"""
+        deleted_files = []
+        with os.scandir(self.download_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    os.unlink(entry.path)
+                    deleted_files.append(entry.name)
+                    logger.info(f"Deleted file: {entry.name}")
+        return deleted_files
+    
+    async def _with_download_slot(self, transfer: Awaitable[str]) -> str:
+        """Run a file transfer once one of the limited download slots is free"""
+        async with self._download_semaphore:
+            return await transfer
+    
     async def _download_file(self, session: aiohttp.ClientSession, filename: str, url: str) -> str:
         """Download a single file asynchronously to local storage"""
+        file_path = self.download_dir / filename
         try:
-            file_path = self.download_dir / filename
+            # Large files are fetched as parallel byte ranges when the server allows it
+            size = await self._get_ranged_content_length(session, url)
+            if size is not None and size >= RANGED_DOWNLOAD_MIN_SIZE:
+                try:
+                    await self._ranged_download(session, url, file_path, size)
+                    return filename
+                except RangeNotSupportedError:
+                    file_path.unlink(missing_ok=True)
+                    logger.info(f"Ranged download not honoured for {filename}, falling back to a single stream")
             
             async with session.get(url) as response:
                 if response.status == 200:
                     async with aiofiles.open(file_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
+                        if response.content_length:
+                            await asyncio.to_thread(preallocate_file, f.fileno(), response.content_length)
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
                             await f.write(chunk)
                     return filename
                 else:
                     raise Exception(f"HTTP {response.status}: {response.reason}")
                     
         except Exception as e:
+            # The file was preallocated to full size, so a partial copy would look complete to extraction
+            file_path.unlink(missing_ok=True)
             raise Exception(f"Failed to download {filename}: {str(e)}")
     
+    async def _get_ranged_content_length(self, session: aiohttp.ClientSession, url: str) -> Optional[int]:
+        """Return the content length if the server supports byte-range requests"""
+        if not hasattr(os, "pwrite"):
+            return None
+        try:
+            async with session.head(url, allow_redirects=True) as response:
+                if response.status != 200 or response.headers.get("Accept-Ranges") != "bytes":
+                    return None
+                return response.content_length
+        except Exception as e:
+            # The plain GET may still succeed, so a failed probe only disables ranged mode
+            logger.warning(f"Range probe failed for {url}, using a single stream: {e}")
+            return None
+    
+    async def _ranged_download(self, session: aiohttp.ClientSession, url: str, file_path: Path, size: int):
+        """Download a file as parallel byte ranges written at their offsets"""
+        part_size = -(-size // RANGED_DOWNLOAD_PARTS)
+        ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+        
+        fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            await asyncio.to_thread(preallocate_file, fd, size)
+            # A failing part cancels its siblings and the group waits for them, so no write outlives the fd
+            try:
+                async with asyncio.TaskGroup() as group:
+                    for start, end in ranges:
+                        group.create_task(self._download_range(session, url, fd, start, end))
+            except ExceptionGroup as eg:
+                raise eg.exceptions[0]
+        finally:
+            os.close(fd)
+    
+    async def _download_range(self, session: aiohttp.ClientSession, url: str, fd: int, start: int, end: int):
+        """Download one byte range into an open file descriptor"""
+        async with session.get(url, headers={"Range": f"bytes={start}-{end}"}) as response:
+            if response.status != 206:
+                # Raising cancels the sibling parts instead of letting them finish a doomed download
+                raise RangeNotSupportedError(f"HTTP {response.status} for range {start}-{end}")
+            offset = start
+            async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                await self._write_at(fd, chunk, offset)
+                offset += len(chunk)
+            if offset != end + 1:
+                raise Exception(f"Incomplete range {start}-{end}: received {offset - start} bytes")
+    
+    async def _write_at(self, fd: int, data: bytes, offset: int):
+        """Write data at an offset in a worker thread, letting the write finish even if cancelled"""
+        write = asyncio.ensure_future(asyncio.to_thread(os.pwrite, fd, data, offset))
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # The thread cannot be interrupted, so wait for it before the caller closes the fd
+            await write
+            raise
+    
     async def _clear_existing_files(self):
         """Clear existing files before downloading new ones"""
-        for filename in self.datasets.keys():
+        for filename in self._keys:
             file_path = self.download_dir / filename
             if file_path.exists():
                 file_path.unlink()
@@ -1,9 +1,104 @@
 import os
 import shutil
+import struct
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import AsyncIterable, AsyncIterator, BinaryIO, List, Dict, Any, Optional, Tuple
 from app.core.logging import logger
 
+try:
+    from isal import igzip as gzip
+    from isal import isal_zlib as zlib
+    ISAL_AVAILABLE = True
+except ImportError:
+    import gzip
+    import zlib
+    ISAL_AVAILABLE = False
+    logger.warning("isal not available, falling back to stdlib gzip decompression")
+
+try:
+    import rapidgzip
+    RAPIDGZIP_AVAILABLE = True
+except ImportError:
+    RAPIDGZIP_AVAILABLE = False
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+# A 10-byte header, an empty deflate block and the 8-byte trailer
+GZIP_MIN_SIZE = 20
+
+def decompress_gzip_file(gz_path: Path, out_path: Path, buffer_size: int = 4 * 1024 * 1024):
+    """Decompress a gzip file to out_path, raising if the input is truncated or corrupt"""
+    if RAPIDGZIP_AVAILABLE:
+        # Decodes deflate blocks in parallel across all cores, but never checks the gzip trailer
+        try:
+            with rapidgzip.open(str(gz_path), parallelization=os.cpu_count()) as f_in:
+                checksum = _copy_with_checksum(f_in, out_path, buffer_size)
+            if checksum == _read_gzip_trailer(gz_path):
+                return
+            # A mismatch means corrupt input or a multi-member file, which the strict reader settles
+            logger.warning(f"Gzip trailer mismatch for {gz_path.name}, re-extracting with the verifying reader")
+        except Exception as e:
+            logger.warning(f"rapidgzip failed on {gz_path.name}, re-extracting with the verifying reader: {e}")
+    
+    try:
+        with gzip.open(gz_path, 'rb') as f_in:
+            with open(out_path, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out, length=buffer_size)
+    except Exception:
+        out_path.unlink(missing_ok=True)
+        raise
+
+def _copy_with_checksum(f_in: BinaryIO, out_path: Path, buffer_size: int) -> Tuple[int, int]:
+    """Copy a stream to out_path and return its CRC32 and size modulo 2**32"""
+    crc = 0
+    size = 0
+    with open(out_path, 'wb') as f_out:
+        while chunk := f_in.read(buffer_size):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            f_out.write(chunk)
+    return crc, size & 0xFFFFFFFF
+
+def _read_gzip_trailer(gz_path: Path) -> Optional[Tuple[int, int]]:
+    """Return the CRC32 and ISIZE stored in the last eight bytes of a gzip file"""
+    with open(gz_path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) < GZIP_MIN_SIZE:
+            return None
+        f.seek(-8, os.SEEK_END)
+        return struct.unpack("<II", f.read(8))
+
+async def decompress_gzip_stream(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Incrementally decompress a gzip byte stream, including multi-member files"""
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    member_started = False
+    async for chunk in chunks:
+        while chunk:
+            member_started = True
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+            if decompressor.eof:
+                # A new gzip member may start right after the previous one
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+                member_started = False
+            else:
+                chunk = b""
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+    if member_started and not decompressor.eof:
+        raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+
+def preallocate_file(fd: int, size: int):
+    """Reserve disk space for a file up front, falling back to a sparse resize"""
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError as e:
+            logger.warning(f"posix_fallocate failed, falling back to ftruncate: {e}")
+    os.ftruncate(fd, size)
+
 def ensure_directory_exists(directory_path: str) -> Path:
     """Ensure a directory exists, create if it doesn't"""
     path = Path(directory_path)
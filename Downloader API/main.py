@@ -2,11 +2,26 @@
 IMDb Dataset Downloader API - Entry Point
 
 This is the main entry point for the application.
-The actual FastAPI app is now located in app/main.py
+The actual FastAPI app is now located in app/main.py and is loaded by
+uvicorn directly, so this module is never re-imported by the server.
 """
 
-from app.main import app
-
 if __name__ == "__main__":
+    import os
+    import sys
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    from app.core.config import get_settings
+    settings = get_settings()
+    # The reload watcher is opt-in so production runs never poll the source tree
+    reload = os.environ.get("UVICORN_RELOAD", "0") == "1"
+    # uvloop and httptools are not available on Windows
+    use_fast_loop = sys.platform != "win32"
+    uvicorn.run(
+        "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        reload=reload,
+        workers=int(os.environ.get("WEB_CONCURRENCY", settings.workers)),
+        loop="uvloop" if use_fast_loop else "auto",
+        http="httptools" if use_fast_loop else "auto"
+    )
@@ -0,0 +1,61 @@
+import gzip
+import os
+
+import pytest
+
+from app.utils import file_utils
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """A local-storage DatasetService that never touches Azure"""
+    monkeypatch.setenv("USE_AZURE_BLOB", "false")
+    monkeypatch.setenv("RELOAD_CONFIG", "1")
+    from app.services.dataset_service import DatasetService
+    return DatasetService()
+
+
+@pytest.fixture(params=[True, False], ids=["rapidgzip", "gzip"])
+def decompressor(request, monkeypatch):
+    """Run each test with and without the rapidgzip fast path"""
+    if request.param and not file_utils.RAPIDGZIP_AVAILABLE:
+        pytest.skip("rapidgzip not installed")
+    monkeypatch.setattr(file_utils, "RAPIDGZIP_AVAILABLE", request.param)
+
+
+@pytest.fixture
+def original():
+    return os.urandom(100_000).hex().encode()
+
+
+def test_extract_file_round_trips(service, decompressor, original, tmp_path):
+    gz_path = tmp_path / "data.tsv.gz"
+    gz_path.write_bytes(gzip.compress(original))
+
+    service._extract_file(gz_path, tmp_path / "data.tsv")
+
+    assert (tmp_path / "data.tsv").read_bytes() == original
+
+
+def test_extract_file_handles_multi_member_files(service, decompressor, original, tmp_path):
+    gz_path = tmp_path / "data.tsv.gz"
+    gz_path.write_bytes(gzip.compress(original) + gzip.compress(b"tail"))
+
+    service._extract_file(gz_path, tmp_path / "data.tsv")
+
+    assert (tmp_path / "data.tsv").read_bytes() == original + b"tail"
+
+
+@pytest.mark.parametrize("corrupt", [
+    lambda data: data[:-30],
+    lambda data: data[:len(data) // 2].ljust(len(data), b"\0"),
+], ids=["truncated", "zero-padded"])
+def test_extract_file_rejects_corrupt_input(service, decompressor, original, tmp_path, corrupt):
+    gz_path = tmp_path / "data.tsv.gz"
+    gz_path.write_bytes(corrupt(gzip.compress(original)))
+    tsv_path = tmp_path / "data.tsv"
+
+    with pytest.raises((EOFError, OSError, file_utils.zlib.error)):
+        service._extract_file(gz_path, tsv_path)
+
+    assert not tsv_path.exists()